@@ -0,0 +1,264 @@
+"""add_active_offer_pool
+
+Revision ID: a1f6c3b0d2e4
+Revises: 75beace17726
+Create Date: 2019-09-10 10:12:41.532117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1f6c3b0d2e4'
+down_revision = '75beace17726'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'active_offer',
+        sa.Column('offerId', sa.BigInteger(), sa.ForeignKey('offer.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('departementCode', sa.String(3), nullable=True),
+        sa.Column('type', sa.String(50), nullable=False),
+        sa.Column('isNational', sa.Boolean(), nullable=False),
+        sa.Column('isOnline', sa.Boolean(), nullable=False),
+        sa.Column('hasActiveMediation', sa.Boolean(), nullable=False),
+        sa.Column('occursSoonOrIsThing', sa.Boolean(), nullable=False),
+        sa.Column('baseScore', sa.Integer(), nullable=False)
+    )
+    op.create_index(op.f('ix_active_offer_departementCode'), 'active_offer', ['departementCode'], unique=False)
+    op.execute("""
+        CREATE OR REPLACE VIEW active_offer_candidate AS
+        SELECT
+            offer.id AS "offerId",
+            venue."departementCode" AS "departementCode",
+            offer.type AS type,
+            offer."isNational" AS "isNational",
+            offer.url IS NOT NULL AS "isOnline",
+            EXISTS (
+                SELECT 1 FROM mediation
+                WHERE mediation."offerId" = offer.id
+                AND mediation."isActive"
+            ) AS "hasActiveMediation",
+            EXISTS (
+                SELECT 1 FROM stock
+                WHERE stock."offerId" = offer.id
+                AND (
+                  stock."beginningDatetime" IS NULL
+                  OR (
+                    stock."beginningDatetime" > (NOW() AT TIME ZONE 'UTC')
+                    AND stock."beginningDatetime" < (NOW() AT TIME ZONE 'UTC') + INTERVAL '10 days'
+                  )
+                )
+            ) AS "occursSoonOrIsThing",
+            (
+                SELECT COALESCE(SUM(criterion."scoreDelta"), 0)
+                FROM criterion
+                JOIN offer_criterion ON criterion.id = offer_criterion."criterionId"
+                WHERE offer_criterion."offerId" = offer.id
+            )::INTEGER AS "baseScore"
+        FROM offer
+        JOIN venue ON venue.id = offer."venueId"
+        JOIN offerer ON offerer.id = venue."managingOffererId"
+        JOIN product ON product.id = offer."productId"
+        WHERE offer."isActive"
+        AND offer.type NOT IN ('EventType.ACTIVATION', 'ThingType.ACTIVATION')
+        AND venue."validationToken" IS NULL
+        AND offerer."isActive"
+        AND offerer."validationToken" IS NULL
+        AND (
+          product."thumbCount" > 0
+          OR EXISTS (
+            SELECT 1 FROM mediation
+            WHERE mediation."offerId" = offer.id
+            AND mediation."isActive"
+          )
+        )
+        AND EXISTS (
+          SELECT 1 FROM stock
+          WHERE stock."offerId" = offer.id
+          AND NOT stock."isSoftDeleted"
+          AND (stock."beginningDatetime" IS NULL
+               OR stock."beginningDatetime" > (NOW() AT TIME ZONE 'UTC'))
+          AND (stock."bookingLimitDatetime" IS NULL
+               OR stock."bookingLimitDatetime" > (NOW() AT TIME ZONE 'UTC'))
+          AND (
+            stock.available IS NULL
+            OR stock.available > (
+              SELECT COALESCE(SUM(booking.quantity), 0)
+              FROM booking
+              WHERE booking."stockId" = stock.id
+              AND NOT booking."isCancelled"
+            )
+          )
+        );
+
+        CREATE OR REPLACE FUNCTION refresh_active_offer(offer_id BIGINT)
+        RETURNS VOID AS $$
+        BEGIN
+          DELETE FROM active_offer WHERE "offerId" = offer_id;
+
+          INSERT INTO active_offer ("offerId", "departementCode", type, "isNational", "isOnline",
+                                   "hasActiveMediation", "occursSoonOrIsThing", "baseScore")
+          SELECT "offerId", "departementCode", type, "isNational", "isOnline",
+                 "hasActiveMediation", "occursSoonOrIsThing", "baseScore"
+          FROM active_offer_candidate WHERE "offerId" = offer_id
+          ON CONFLICT ("offerId") DO UPDATE SET
+            "departementCode" = EXCLUDED."departementCode",
+            type = EXCLUDED.type,
+            "isNational" = EXCLUDED."isNational",
+            "isOnline" = EXCLUDED."isOnline",
+            "hasActiveMediation" = EXCLUDED."hasActiveMediation",
+            "occursSoonOrIsThing" = EXCLUDED."occursSoonOrIsThing",
+            "baseScore" = EXCLUDED."baseScore";
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION refresh_all_active_offers()
+        RETURNS VOID AS $$
+        BEGIN
+          LOCK TABLE active_offer IN EXCLUSIVE MODE;
+          DELETE FROM active_offer;
+          INSERT INTO active_offer ("offerId", "departementCode", type, "isNational", "isOnline",
+                                   "hasActiveMediation", "occursSoonOrIsThing", "baseScore")
+          SELECT "offerId", "departementCode", type, "isNational", "isOnline",
+                 "hasActiveMediation", "occursSoonOrIsThing", "baseScore"
+          FROM active_offer_candidate;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION refresh_active_offer_from_offer()
+        RETURNS TRIGGER AS $$
+        BEGIN
+          PERFORM refresh_active_offer(NEW.id);
+          RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION refresh_active_offer_from_offer_child()
+        RETURNS TRIGGER AS $$
+        BEGIN
+          IF TG_OP IN ('UPDATE', 'DELETE') AND OLD."offerId" IS NOT NULL THEN
+            PERFORM refresh_active_offer(OLD."offerId");
+          END IF;
+          IF TG_OP IN ('INSERT', 'UPDATE') AND NEW."offerId" IS NOT NULL
+             AND (TG_OP = 'INSERT' OR NEW."offerId" IS DISTINCT FROM OLD."offerId") THEN
+            PERFORM refresh_active_offer(NEW."offerId");
+          END IF;
+          RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION refresh_active_offer_from_booking()
+        RETURNS TRIGGER AS $$
+        BEGIN
+          IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM refresh_active_offer(stock."offerId")
+            FROM stock WHERE stock.id = OLD."stockId";
+          END IF;
+          IF TG_OP = 'INSERT'
+             OR (TG_OP = 'UPDATE' AND NEW."stockId" IS DISTINCT FROM OLD."stockId") THEN
+            PERFORM refresh_active_offer(stock."offerId")
+            FROM stock WHERE stock.id = NEW."stockId";
+          END IF;
+          RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION refresh_active_offer_from_product()
+        RETURNS TRIGGER AS $$
+        BEGIN
+          PERFORM refresh_active_offer(offer.id)
+          FROM offer WHERE offer."productId" = NEW.id;
+          RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION refresh_active_offer_from_venue()
+        RETURNS TRIGGER AS $$
+        BEGIN
+          PERFORM refresh_active_offer(offer.id)
+          FROM offer WHERE offer."venueId" = NEW.id;
+          RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION refresh_active_offer_from_offerer()
+        RETURNS TRIGGER AS $$
+        BEGIN
+          PERFORM refresh_active_offer(offer.id)
+          FROM offer
+          JOIN venue ON venue.id = offer."venueId"
+          WHERE venue."managingOffererId" = NEW.id;
+          RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS active_offer_offer_update ON offer;
+        CREATE TRIGGER active_offer_offer_update AFTER INSERT OR UPDATE
+        ON offer
+        FOR EACH ROW EXECUTE PROCEDURE refresh_active_offer_from_offer();
+
+        DROP TRIGGER IF EXISTS active_offer_stock_update ON stock;
+        CREATE TRIGGER active_offer_stock_update AFTER INSERT OR UPDATE OR DELETE
+        ON stock
+        FOR EACH ROW EXECUTE PROCEDURE refresh_active_offer_from_offer_child();
+
+        DROP TRIGGER IF EXISTS active_offer_mediation_update ON mediation;
+        CREATE TRIGGER active_offer_mediation_update AFTER INSERT OR UPDATE OR DELETE
+        ON mediation
+        FOR EACH ROW EXECUTE PROCEDURE refresh_active_offer_from_offer_child();
+
+        DROP TRIGGER IF EXISTS active_offer_offer_criterion_update ON offer_criterion;
+        CREATE TRIGGER active_offer_offer_criterion_update AFTER INSERT OR UPDATE OR DELETE
+        ON offer_criterion
+        FOR EACH ROW EXECUTE PROCEDURE refresh_active_offer_from_offer_child();
+
+        DROP TRIGGER IF EXISTS active_offer_booking_update ON booking;
+        CREATE TRIGGER active_offer_booking_update AFTER INSERT OR UPDATE OR DELETE
+        ON booking
+        FOR EACH ROW EXECUTE PROCEDURE refresh_active_offer_from_booking();
+
+        DROP TRIGGER IF EXISTS active_offer_product_update ON product;
+        CREATE TRIGGER active_offer_product_update AFTER UPDATE OF "thumbCount"
+        ON product
+        FOR EACH ROW EXECUTE PROCEDURE refresh_active_offer_from_product();
+
+        DROP TRIGGER IF EXISTS active_offer_venue_update ON venue;
+        CREATE TRIGGER active_offer_venue_update AFTER UPDATE OF "validationToken", "departementCode"
+        ON venue
+        FOR EACH ROW EXECUTE PROCEDURE refresh_active_offer_from_venue();
+
+        DROP TRIGGER IF EXISTS active_offer_offerer_update ON offerer;
+        CREATE TRIGGER active_offer_offerer_update AFTER UPDATE OF "isActive", "validationToken"
+        ON offerer
+        FOR EACH ROW EXECUTE PROCEDURE refresh_active_offer_from_offerer();
+
+        SELECT refresh_all_active_offers();
+        """)
+
+
+def downgrade():
+    op.execute("""
+        DROP TRIGGER IF EXISTS active_offer_offer_update ON offer;
+        DROP TRIGGER IF EXISTS active_offer_stock_update ON stock;
+        DROP TRIGGER IF EXISTS active_offer_mediation_update ON mediation;
+        DROP TRIGGER IF EXISTS active_offer_offer_criterion_update ON offer_criterion;
+        DROP TRIGGER IF EXISTS active_offer_booking_update ON booking;
+        DROP TRIGGER IF EXISTS active_offer_product_update ON product;
+        DROP TRIGGER IF EXISTS active_offer_venue_update ON venue;
+        DROP TRIGGER IF EXISTS active_offer_offerer_update ON offerer;
+        DROP FUNCTION IF EXISTS refresh_active_offer_from_offer();
+        DROP FUNCTION IF EXISTS refresh_active_offer_from_offer_child();
+        DROP FUNCTION IF EXISTS refresh_active_offer_from_booking();
+        DROP FUNCTION IF EXISTS refresh_active_offer_from_product();
+        DROP FUNCTION IF EXISTS refresh_active_offer_from_venue();
+        DROP FUNCTION IF EXISTS refresh_active_offer_from_offerer();
+        DROP FUNCTION IF EXISTS refresh_all_active_offers();
+        DROP FUNCTION IF EXISTS refresh_active_offer(BIGINT);
+        DROP VIEW IF EXISTS active_offer_candidate;
+        """)
+    op.drop_index(op.f('ix_active_offer_departementCode'), table_name='active_offer')
+    op.drop_table('active_offer')
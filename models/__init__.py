@@ -1,3 +1,4 @@
+from models.active_offer import ActiveOffer
 from models.api_errors import ApiErrors
 from models.bank_information import BankInformation
 from models.beneficiary_import import BeneficiaryImport
@@ -43,6 +44,7 @@ from models.versioned_mixin import VersionedMixin
 
 __all__ = (
     'VersionedMixin',
+    'ActiveOffer',
     'ApiErrors',
     'BankInformation',
     'BeneficiaryImport',
@@ -0,0 +1,255 @@
+""" active offer """
+from sqlalchemy import BigInteger, \
+    Boolean, \
+    Column, \
+    DDL, \
+    event, \
+    ForeignKey, \
+    Integer, \
+    String
+from sqlalchemy.orm import relationship
+
+from models.db import Model
+
+
+class ActiveOffer(Model):
+    """
+    Precomputed pool of the offers that can be recommended in discovery.
+    Rows are maintained by the triggers declared in `ActiveOffer.trig_ddl`
+    whenever an offer, stock, booking, mediation, product, venue, offerer or
+    offer criterion changes. Rows depending on the current date
+    (`occursSoonOrIsThing`, bookability) drift with time and are rebuilt by
+    `refresh_all_active_offers()`.
+    """
+    offerId = Column(BigInteger,
+                     ForeignKey('offer.id', ondelete='CASCADE'),
+                     primary_key=True)
+
+    offer = relationship('Offer',
+                         foreign_keys=[offerId])
+
+    departementCode = Column(String(3), nullable=True, index=True)
+
+    type = Column(String(50), nullable=False)
+
+    isNational = Column(Boolean, nullable=False)
+
+    isOnline = Column(Boolean, nullable=False)
+
+    hasActiveMediation = Column(Boolean, nullable=False)
+
+    occursSoonOrIsThing = Column(Boolean, nullable=False)
+
+    baseScore = Column(Integer, nullable=False)
+
+
+ActiveOffer.trig_ddl = """
+    CREATE OR REPLACE VIEW active_offer_candidate AS
+    SELECT
+        offer.id AS "offerId",
+        venue."departementCode" AS "departementCode",
+        offer.type AS type,
+        offer."isNational" AS "isNational",
+        offer.url IS NOT NULL AS "isOnline",
+        EXISTS (
+            SELECT 1 FROM mediation
+            WHERE mediation."offerId" = offer.id
+            AND mediation."isActive"
+        ) AS "hasActiveMediation",
+        EXISTS (
+            SELECT 1 FROM stock
+            WHERE stock."offerId" = offer.id
+            AND (
+              stock."beginningDatetime" IS NULL
+              OR (
+                stock."beginningDatetime" > (NOW() AT TIME ZONE 'UTC')
+                AND stock."beginningDatetime" < (NOW() AT TIME ZONE 'UTC') + INTERVAL '10 days'
+              )
+            )
+        ) AS "occursSoonOrIsThing",
+        (
+            SELECT COALESCE(SUM(criterion."scoreDelta"), 0)
+            FROM criterion
+            JOIN offer_criterion ON criterion.id = offer_criterion."criterionId"
+            WHERE offer_criterion."offerId" = offer.id
+        )::INTEGER AS "baseScore"
+    FROM offer
+    JOIN venue ON venue.id = offer."venueId"
+    JOIN offerer ON offerer.id = venue."managingOffererId"
+    JOIN product ON product.id = offer."productId"
+    WHERE offer."isActive"
+    AND offer.type NOT IN ('EventType.ACTIVATION', 'ThingType.ACTIVATION')
+    AND venue."validationToken" IS NULL
+    AND offerer."isActive"
+    AND offerer."validationToken" IS NULL
+    AND (
+      product."thumbCount" > 0
+      OR EXISTS (
+        SELECT 1 FROM mediation
+        WHERE mediation."offerId" = offer.id
+        AND mediation."isActive"
+      )
+    )
+    AND EXISTS (
+      SELECT 1 FROM stock
+      WHERE stock."offerId" = offer.id
+      AND NOT stock."isSoftDeleted"
+      AND (stock."beginningDatetime" IS NULL
+           OR stock."beginningDatetime" > (NOW() AT TIME ZONE 'UTC'))
+      AND (stock."bookingLimitDatetime" IS NULL
+           OR stock."bookingLimitDatetime" > (NOW() AT TIME ZONE 'UTC'))
+      AND (
+        stock.available IS NULL
+        OR stock.available > (
+          SELECT COALESCE(SUM(booking.quantity), 0)
+          FROM booking
+          WHERE booking."stockId" = stock.id
+          AND NOT booking."isCancelled"
+        )
+      )
+    );
+
+    CREATE OR REPLACE FUNCTION refresh_active_offer(offer_id BIGINT)
+    RETURNS VOID AS $$
+    BEGIN
+      DELETE FROM active_offer WHERE "offerId" = offer_id;
+
+      INSERT INTO active_offer ("offerId", "departementCode", type, "isNational", "isOnline",
+                               "hasActiveMediation", "occursSoonOrIsThing", "baseScore")
+      SELECT "offerId", "departementCode", type, "isNational", "isOnline",
+             "hasActiveMediation", "occursSoonOrIsThing", "baseScore"
+      FROM active_offer_candidate WHERE "offerId" = offer_id
+      ON CONFLICT ("offerId") DO UPDATE SET
+        "departementCode" = EXCLUDED."departementCode",
+        type = EXCLUDED.type,
+        "isNational" = EXCLUDED."isNational",
+        "isOnline" = EXCLUDED."isOnline",
+        "hasActiveMediation" = EXCLUDED."hasActiveMediation",
+        "occursSoonOrIsThing" = EXCLUDED."occursSoonOrIsThing",
+        "baseScore" = EXCLUDED."baseScore";
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION refresh_all_active_offers()
+    RETURNS VOID AS $$
+    BEGIN
+      LOCK TABLE active_offer IN EXCLUSIVE MODE;
+      DELETE FROM active_offer;
+      INSERT INTO active_offer ("offerId", "departementCode", type, "isNational", "isOnline",
+                               "hasActiveMediation", "occursSoonOrIsThing", "baseScore")
+      SELECT "offerId", "departementCode", type, "isNational", "isOnline",
+             "hasActiveMediation", "occursSoonOrIsThing", "baseScore"
+      FROM active_offer_candidate;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION refresh_active_offer_from_offer()
+    RETURNS TRIGGER AS $$
+    BEGIN
+      PERFORM refresh_active_offer(NEW.id);
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION refresh_active_offer_from_offer_child()
+    RETURNS TRIGGER AS $$
+    BEGIN
+      IF TG_OP IN ('UPDATE', 'DELETE') AND OLD."offerId" IS NOT NULL THEN
+        PERFORM refresh_active_offer(OLD."offerId");
+      END IF;
+      IF TG_OP IN ('INSERT', 'UPDATE') AND NEW."offerId" IS NOT NULL
+         AND (TG_OP = 'INSERT' OR NEW."offerId" IS DISTINCT FROM OLD."offerId") THEN
+        PERFORM refresh_active_offer(NEW."offerId");
+      END IF;
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION refresh_active_offer_from_booking()
+    RETURNS TRIGGER AS $$
+    BEGIN
+      IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM refresh_active_offer(stock."offerId")
+        FROM stock WHERE stock.id = OLD."stockId";
+      END IF;
+      IF TG_OP = 'INSERT'
+         OR (TG_OP = 'UPDATE' AND NEW."stockId" IS DISTINCT FROM OLD."stockId") THEN
+        PERFORM refresh_active_offer(stock."offerId")
+        FROM stock WHERE stock.id = NEW."stockId";
+      END IF;
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION refresh_active_offer_from_product()
+    RETURNS TRIGGER AS $$
+    BEGIN
+      PERFORM refresh_active_offer(offer.id)
+      FROM offer WHERE offer."productId" = NEW.id;
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION refresh_active_offer_from_venue()
+    RETURNS TRIGGER AS $$
+    BEGIN
+      PERFORM refresh_active_offer(offer.id)
+      FROM offer WHERE offer."venueId" = NEW.id;
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION refresh_active_offer_from_offerer()
+    RETURNS TRIGGER AS $$
+    BEGIN
+      PERFORM refresh_active_offer(offer.id)
+      FROM offer
+      JOIN venue ON venue.id = offer."venueId"
+      WHERE venue."managingOffererId" = NEW.id;
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS active_offer_offer_update ON offer;
+    CREATE TRIGGER active_offer_offer_update AFTER INSERT OR UPDATE
+    ON offer
+    FOR EACH ROW EXECUTE PROCEDURE refresh_active_offer_from_offer();
+
+    DROP TRIGGER IF EXISTS active_offer_stock_update ON stock;
+    CREATE TRIGGER active_offer_stock_update AFTER INSERT OR UPDATE OR DELETE
+    ON stock
+    FOR EACH ROW EXECUTE PROCEDURE refresh_active_offer_from_offer_child();
+
+    DROP TRIGGER IF EXISTS active_offer_mediation_update ON mediation;
+    CREATE TRIGGER active_offer_mediation_update AFTER INSERT OR UPDATE OR DELETE
+    ON mediation
+    FOR EACH ROW EXECUTE PROCEDURE refresh_active_offer_from_offer_child();
+
+    DROP TRIGGER IF EXISTS active_offer_offer_criterion_update ON offer_criterion;
+    CREATE TRIGGER active_offer_offer_criterion_update AFTER INSERT OR UPDATE OR DELETE
+    ON offer_criterion
+    FOR EACH ROW EXECUTE PROCEDURE refresh_active_offer_from_offer_child();
+
+    DROP TRIGGER IF EXISTS active_offer_booking_update ON booking;
+    CREATE TRIGGER active_offer_booking_update AFTER INSERT OR UPDATE OR DELETE
+    ON booking
+    FOR EACH ROW EXECUTE PROCEDURE refresh_active_offer_from_booking();
+
+    DROP TRIGGER IF EXISTS active_offer_product_update ON product;
+    CREATE TRIGGER active_offer_product_update AFTER UPDATE OF "thumbCount"
+    ON product
+    FOR EACH ROW EXECUTE PROCEDURE refresh_active_offer_from_product();
+
+    DROP TRIGGER IF EXISTS active_offer_venue_update ON venue;
+    CREATE TRIGGER active_offer_venue_update AFTER UPDATE OF "validationToken", "departementCode"
+    ON venue
+    FOR EACH ROW EXECUTE PROCEDURE refresh_active_offer_from_venue();
+
+    DROP TRIGGER IF EXISTS active_offer_offerer_update ON offerer;
+    CREATE TRIGGER active_offer_offerer_update AFTER UPDATE OF "isActive", "validationToken"
+    ON offerer
+    FOR EACH ROW EXECUTE PROCEDURE refresh_active_offer_from_offerer();
+    """
+event.listen(Model.metadata,
+             'after_create',
+             DDL(ActiveOffer.trig_ddl))
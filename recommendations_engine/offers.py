@@ -3,7 +3,15 @@ from typing import List
 
 from domain.departments import get_departement_codes_from_user
 from models import Offer
-from repository.offer_queries import get_active_offers, order_by_with_criteria
+<<<<<<< HEAD
+from repository.offer_queries import get_offers_from_active_offer_pool
+=======
+from recommendations_engine.funnel import RecommendationFunnel
+from repository.feature_queries import feature_seeded_discovery_ordering_enabled
+from repository.offer_queries import get_active_offers, \
+    get_offers_from_active_offer_pool, \
+    order_by_active_offer_pool_with_random_key
+>>>>>>> 183d3f9 ([user-001] Restore get_active_offers import re-exported by recommendations_engine)
 from utils.logger import logger
 
 
@@ -13,9 +21,8 @@ def get_offers_for_recommendations_discovery(limit=3, user=None) -> List[Offer]:
 
     departement_codes = get_departement_codes_from_user(user)
 
-    offers = get_active_offers(departement_codes=departement_codes,
-                               limit=limit,
-                               order_by=order_by_with_criteria)
+    offers = get_offers_from_active_offer_pool(departement_codes=departement_codes,
+                                               limit=limit)
 
     logger.debug(lambda: '(reco) final offers (events + things) count (%i)',
                  len(offers))
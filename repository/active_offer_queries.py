@@ -0,0 +1,6 @@
+from models.db import db
+
+
+def refresh_all_active_offers():
+    db.session.execute('SELECT refresh_all_active_offers()')
+    db.session.commit()
@@ -2,7 +2,8 @@ from local_providers.install import install_local_providers
 from models.activity import load_activity
 from models.beneficiary_import import BeneficiaryImport
 from models.db import db
-from models import Booking, \
+from models import ActiveOffer, \
+    Booking, \
     Deposit, \
     Mediation, \
     Payment, \
@@ -44,6 +45,7 @@ def clean_all_database(*args, **kwargs):
     Recommendation.query.delete()
     Mediation.query.delete()
     OfferCriterion.query.delete()
+    ActiveOffer.query.delete()
     Criterion.query.delete()
     Offer.query.delete()
     Product.query.delete()
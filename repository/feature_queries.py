@@ -63,6 +63,10 @@ def feature_cron_send_remedial_emails() -> bool:
     return os.environ.get('CRON_SEND_REMEDIAL_EMAILS', False)
 
 
+def feature_cron_refresh_active_offers() -> bool:
+    return os.environ.get('CRON_REFRESH_ACTIVE_OFFERS', False)
+
+
 def feature_request_profiling_enabled() -> bool:
     return os.environ.get('PROFILE_REQUESTS', False)
 
@@ -9,7 +9,8 @@ from domain.departments import ILE_DE_FRANCE_DEPT_CODES
 from domain.keywords import create_filter_matching_all_keywords_in_any_model, \
     create_get_filter_matching_ts_query_in_any_model, \
     get_first_matching_keywords_string_at_column
-from models import Booking, \
+from models import ActiveOffer, \
+    Booking, \
     EventType, \
     Mediation, \
     Offer, \
@@ -96,6 +97,35 @@ def get_active_offers(departement_codes=None, offer_id=None, limit=None,
     return query.all()
 
 
+def order_by_active_offer_pool_with_criteria():
+    return [desc(ActiveOffer.occursSoonOrIsThing),
+            desc(ActiveOffer.baseScore),
+            func.random()]
+
+
+def get_offers_from_active_offer_pool(departement_codes=None, limit=None,
+                                      order_by=order_by_active_offer_pool_with_criteria):
+    query = Offer.query.join(ActiveOffer, ActiveOffer.offerId == Offer.id)
+
+    if departement_codes and '00' not in departement_codes:
+        query = query.filter(ActiveOffer.departementCode.in_(departement_codes)
+                             | (ActiveOffer.isNational == True))
+
+    query = query.order_by(desc(ActiveOffer.hasActiveMediation))
+
+    query = query.order_by(func.row_number()
+                           .over(partition_by=[ActiveOffer.type, ActiveOffer.isOnline],
+                                 order_by=order_by()))
+
+    query = query.options(joinedload('mediations'),
+                          joinedload('product'))
+
+    if limit:
+        query = query.limit(limit)
+
+    return query.all()
+
+
 def get_active_offers_ids_query(departement_codes=['00'], offer_id=None):
     active_offers_query = Offer.query.distinct(Offer.id) \
         .order_by(Offer.id)
@@ -16,7 +16,8 @@ from repository.feature_queries import feature_cron_send_wallet_balances
 from repository.feature_queries import feature_import_beneficiaries_enabled, \
     feature_cron_synchronize_titelive_things, feature_cron_synchronize_titelive_descriptions, \
     feature_cron_synchronize_titelive_thumbs, \
-    feature_cron_retrieve_bank_information_for_venue_without_siret
+    feature_cron_retrieve_bank_information_for_venue_without_siret, \
+    feature_cron_refresh_active_offers
 from repository.user_queries import find_most_recent_beneficiary_creation_date
 from scripts.beneficiary import remote_import
 from scripts.dashboard.write_dashboard import write_dashboard
@@ -154,6 +155,14 @@ def pc_write_dashboard():
     logger.info("[BATCH][WRITE DASHBOARD] Cron write_dashboard: END")
 
 
+def pc_refresh_active_offers():
+    logger.info("[BATCH][ACTIVE OFFERS] Cron refresh_active_offers: START")
+    with app.app_context():
+        from repository.active_offer_queries import refresh_all_active_offers
+        refresh_all_active_offers()
+    logger.info("[BATCH][ACTIVE OFFERS] Cron refresh_active_offers: END")
+
+
 if __name__ == '__main__':
     orm.configure_mappers()
     scheduler = BlockingScheduler()
@@ -196,4 +205,8 @@ if __name__ == '__main__':
 
     if feature_write_dashboard_enabled():
         scheduler.add_job(pc_write_dashboard, 'cron', id='pc_write_dashboard', day_of_week='mon', hour='4')
+
+    if feature_cron_refresh_active_offers():
+        scheduler.add_job(pc_refresh_active_offers, 'cron', id='refresh_active_offers', minute='*/30')
+
     scheduler.start()
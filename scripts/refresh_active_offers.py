@@ -0,0 +1,19 @@
+""" refresh active offers """
+import traceback
+from pprint import pprint
+
+from flask import current_app as app
+
+from repository.active_offer_queries import refresh_all_active_offers
+from utils.logger import logger
+
+
+@app.manager.command
+def refresh_active_offers():
+    try:
+        refresh_all_active_offers()
+        logger.info("Active offer pool rebuilt")
+    except Exception as e:
+        print('ERROR: ' + str(e))
+        traceback.print_tb(e.__traceback__)
+        pprint(vars(e))
@@ -10,9 +10,11 @@ from repository.offer_queries import department_or_national_offers, \
     find_offers_with_filter_parameters, \
     get_offers_for_recommendations_search, \
     get_active_offers, \
+    get_offers_from_active_offer_pool, \
     _has_remaining_stock_predicate,\
     find_offers_by_venue_id, \
     order_by_with_criteria
+from repository.active_offer_queries import refresh_all_active_offers
 from tests.conftest import clean_database
 from tests.test_utils import create_booking, \
     create_criterion, \
@@ -947,3 +949,68 @@ class GetActiveOffersTest:
 
         # Then
         assert offers == [offer2, offer3, offer1]
+
+
+class GetOffersFromActiveOfferPoolTest:
+    @clean_database
+    def test_returns_offers_in_given_departements_or_national(self, app):
+        # Given
+        offerer = create_offerer()
+        venue_34 = create_venue(offerer, postal_code='34000', departement_code='34', siret=offerer.siren + '11111')
+        venue_93 = create_venue(offerer, postal_code='93000', departement_code='93', siret=offerer.siren + '22222')
+        offer_34 = create_offer_with_thing_product(venue_34)
+        offer_93 = create_offer_with_thing_product(venue_93)
+        national_offer_34 = create_offer_with_thing_product(venue_34, is_national=True)
+        PcObject.save(create_stock_from_offer(offer_34),
+                      create_stock_from_offer(offer_93),
+                      create_stock_from_offer(national_offer_34))
+
+        # When
+        offers = get_offers_from_active_offer_pool(departement_codes=['93'])
+
+        # Then
+        assert set(offers) == {offer_93, national_offer_34}
+
+    @clean_database
+    def test_removes_offer_from_pool_when_its_offerer_is_deactivated(self, app):
+        # Given
+        offerer = create_offerer()
+        venue = create_venue(offerer, postal_code='34000', departement_code='34')
+        offer = create_offer_with_thing_product(venue)
+        PcObject.save(create_stock_from_offer(offer))
+
+        # When
+        offerer.isActive = False
+        PcObject.save(offerer)
+
+        # Then
+        assert get_offers_from_active_offer_pool(departement_codes=['00']) == []
+
+    @clean_database
+    def test_removes_offer_from_pool_when_its_stock_is_fully_booked(self, app):
+        # Given
+        offerer = create_offerer()
+        venue = create_venue(offerer, postal_code='34000', departement_code='34')
+        offer = create_offer_with_thing_product(venue)
+        stock = create_stock_from_offer(offer, available=1, price=0)
+        PcObject.save(stock)
+
+        # When
+        PcObject.save(create_booking(create_user(), stock, venue=venue, quantity=1))
+
+        # Then
+        assert get_offers_from_active_offer_pool(departement_codes=['00']) == []
+
+    @clean_database
+    def test_refresh_all_active_offers_rebuilds_the_pool(self, app):
+        # Given
+        offerer = create_offerer()
+        venue = create_venue(offerer, postal_code='34000', departement_code='34')
+        offer = create_offer_with_thing_product(venue)
+        PcObject.save(create_stock_from_offer(offer))
+
+        # When
+        refresh_all_active_offers()
+
+        # Then
+        assert get_offers_from_active_offer_pool(departement_codes=['00']) == [offer]